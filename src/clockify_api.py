@@ -0,0 +1,170 @@
+"""
+Minimal Clockify REST API client.
+
+Talks to the Clockify API directly over a single keep-alive HTTP session instead
+of starting clockify-cli for every operation. The API key and workspace are read
+from the CLOCKIFY_TOKEN and CLOCKIFY_WORKSPACE environment variables, falling
+back to the ones clockify-cli stores in its config file (~/.clockify-cli.yaml).
+"""
+
+import functools
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# orjson is optional, it decodes the response bytes directly and is faster
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from ratelimit import MAX_RETRIES, clockify_bucket
+
+API_URL = "https://api.clockify.me/api/v1"
+
+# Config file written by `clockify-cli config init`
+CLI_CONFIG_FILE = os.path.expanduser("~/.clockify-cli.yaml")
+
+# Number of items requested per page from list endpoints
+PAGE_SIZE = 200
+
+# Seconds to wait for Clockify to answer a request
+REQUEST_TIMEOUT = 30
+
+# Number of time entries deleted per bulk delete request
+DELETE_BATCH_SIZE = 50
+
+class ClockifyError(Exception):
+    """Raised when a Clockify API request fails."""
+
+def load_cli_config(config_file=CLI_CONFIG_FILE):
+    """Read the top-level settings (token, workspace, ...) from clockify-cli's config file."""
+    config = {}
+    try:
+        with open(config_file, 'r') as f:
+            for line in f:
+                # Nested keys are indented, we only need the top-level ones
+                if line[:1].isspace() or line.startswith('#') or ':' not in line:
+                    continue
+                key, value = line.split(':', 1)
+                config[key.strip()] = value.strip().strip('"\'')
+    except FileNotFoundError:
+        pass
+    return config
+
+class ClockifyClient:
+    """Clockify API client sharing one HTTP session between all requests."""
+
+    def __init__(self, token=None, workspace=None, pool_size=8):
+        cli_config = load_cli_config()
+        token = token or os.environ.get("CLOCKIFY_TOKEN") or cli_config.get("token")
+        if not token:
+            raise ClockifyError("No Clockify API key found, set CLOCKIFY_TOKEN or run `clockify-cli config init`")
+
+        self.session = requests.Session()
+        self.session.headers["X-Api-Key"] = token
+        # Keep one connection per worker thread alive instead of reconnecting
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+        self._workspace = workspace or os.environ.get("CLOCKIFY_WORKSPACE") or cli_config.get("workspace")
+        self._user = None
+
+    def _request(self, method, path, **kwargs):
+        """Send a rate limited request, slowing down and retrying while Clockify answers with HTTP 429."""
+        for attempt in range(MAX_RETRIES + 1):
+            clockify_bucket.acquire()
+            try:
+                response = self.session.request(method, f"{API_URL}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+            except requests.RequestException as e:
+                raise ClockifyError(f"{method} {path} failed: {e}") from e
+
+            if response.status_code != 429:
+                clockify_bucket.recover()
+                break
+            if attempt == MAX_RETRIES:
+                break
+            clockify_bucket.throttle()
+            time.sleep(2 ** attempt)
+
+        if not response.ok:
+            raise ClockifyError(f"{method} {path} failed with HTTP {response.status_code}: {response.text.strip()}")
+        if not response.content:
+            return None
+        try:
+            return json_loads(response.content)
+        except ValueError as e:
+            raise ClockifyError(f"{method} {path} returned invalid JSON: {e}") from e
+
+    def _paginate(self, path, params=None):
+        """Yield the items of a paginated list endpoint, one page at a time."""
+        params = dict(params or {}, **{"page-size": PAGE_SIZE})
+        page = 1
+        while True:
+            items = self._request("GET", path, params=dict(params, page=page))
+            yield from items
+            if len(items) < PAGE_SIZE:
+                return
+            page += 1
+
+    def get_user(self):
+        """Get the user the API key belongs to."""
+        if self._user is None:
+            self._user = self._request("GET", "/user")
+        return self._user
+
+    @property
+    def workspace(self):
+        """ID of the workspace to work in, the user's active one unless configured."""
+        if not self._workspace:
+            self._workspace = self.get_user()["activeWorkspace"]
+        return self._workspace
+
+    def list_clients(self):
+        """List the active clients of the workspace."""
+        return list(self._paginate(f"/workspaces/{self.workspace}/clients", {"archived": "false"}))
+
+    def list_projects(self, client_id=None):
+        """List the active projects of a client, or of the whole workspace."""
+        params = {"archived": "false"}
+        if client_id:
+            params["clients"] = client_id
+        return list(self._paginate(f"/workspaces/{self.workspace}/projects", params))
+
+    def list_entries(self, start, end):
+        """Yield the user's time entries between two UTC timestamps (YYYY-MM-DDTHH:MM:SSZ)."""
+        path = f"/workspaces/{self.workspace}/user/{self.get_user()['id']}/time-entries"
+        yield from self._paginate(path, {"start": start, "end": end, "hydrated": "true"})
+
+    def add_entry(self, start, end, project_id, description):
+        """Add a time entry between two UTC timestamps (YYYY-MM-DDTHH:MM:SSZ)."""
+        body = {
+            "start": start,
+            "end": end,
+            "projectId": project_id,
+            "description": description,
+        }
+        path = f"/workspaces/{self.workspace}/time-entries"
+        entry = self._request("POST", path, json=body)
+        if not isinstance(entry, dict) or "id" not in entry:
+            raise ClockifyError(f"POST {path} returned no time entry")
+        return entry
+
+    def delete_entry(self, entry_id):
+        """Delete a time entry."""
+        self._request("DELETE", f"/workspaces/{self.workspace}/time-entries/{entry_id}")
+
+    def delete_entries(self, entry_ids):
+        """Delete several of the user's time entries with a single request.
+
+        Keep the batches to about DELETE_BATCH_SIZE entries, all IDs end up in
+        the query string.
+        """
+        path = f"/workspaces/{self.workspace}/user/{self.get_user()['id']}/time-entries"
+        self._request("DELETE", path, params={"time-entry-ids": list(entry_ids)})
+
+@functools.lru_cache(maxsize=None)
+def get_clockify_client():
+    """Get the client shared by the whole run, created on first use."""
+    return ClockifyClient()
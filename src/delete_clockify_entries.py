@@ -3,14 +3,26 @@
 Clockify Entry Deletion Tool
 
 This script helps delete time entries from Clockify within a specified date range.
-It uses the clockify-cli tool to list and delete entries.
+It uses the Clockify API to list and delete entries.
 """
 
 import argparse
-import json
-import subprocess
 import sys
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from clockify_api import DELETE_BATCH_SIZE, ClockifyError, get_clockify_client
+from migration_cache import DEFAULT_CACHE_FILE, forget_clockify_entries
+from timestamps import parse_timestamp
+
+# Shown in place of missing entry details
+UNKNOWN = 'Unknown'
+ONGOING = 'Ongoing'
+NO_DESCRIPTION = 'No description'
+NO_PROJECT = 'No project'
+
+# Number of Clockify API requests running in parallel
+MAX_WORKERS = 8
 
 def parse_arguments():
     """Parse command line arguments."""
@@ -35,79 +47,83 @@ def parse_arguments():
         action='store_true',
         help='Ask for confirmation before deleting each entry'
     )
+    parser.add_argument(
+        '--cache-file',
+        default=DEFAULT_CACHE_FILE,
+        help=f'Cache of migrated entries to remove deleted entries from (default: {DEFAULT_CACHE_FILE})'
+    )
     return parser.parse_args()
 
 def get_clockify_entries(start_date, end_date):
-    """Get time entries from Clockify within the specified date range."""
+    """Stream time entries from Clockify within the specified date range."""
+    # The dates are local days, the API expects UTC timestamps. Add one day to
+    # end_date to make the range inclusive of the whole end day.
+    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    start_str = start_dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    end_str = end_dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    
+    # Entries are fetched page by page instead of as one big report
     try:
-        # Add one day to end_date to make the range inclusive
-        # since clockify-cli's date range appears to be exclusive of the end date
-        try:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            inclusive_end = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
-        except ValueError:
-            # If date parsing fails, use the original end_date
-            inclusive_end = end_date
-        
-        # Use clockify-cli report with JSON output to get entries
-        result = subprocess.run(
-            ["clockify-cli", "report", start_date, inclusive_end, "--json"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        # Parse the JSON output
-        entries = json.loads(result.stdout)
-        return entries
-    except subprocess.CalledProcessError as e:
-        print(f"Error getting Clockify entries: {e.stderr}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error parsing Clockify entries JSON: {e}")
-        return []
+        yield from get_clockify_client().list_entries(start_str, end_str)
+    except ClockifyError as e:
+        print(f"Error getting Clockify entries: {e}")
+
+def format_timestamp(timestamp):
+    """Format a Clockify timestamp for display, leaving it as-is if it can't be parsed."""
+    try:
+        return parse_timestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return timestamp
 
 def format_entry_info(entry):
     """Format entry information for display."""
-    start_time = entry.get('timeInterval', {}).get('start', 'Unknown')
-    end_time = entry.get('timeInterval', {}).get('end', 'Ongoing')
-    duration = entry.get('timeInterval', {}).get('duration', 'Unknown')
-    description = entry.get('description', 'No description')
-    project = entry.get('project', {}).get('name', 'No project')
+    time_interval = entry.get('timeInterval') or {}
+    start_time = time_interval.get('start')
+    end_time = time_interval.get('end')
     
-    # Format start and end times for display
-    if start_time != 'Unknown':
-        try:
-            start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            start_formatted = start_dt.strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            start_formatted = start_time
-    else:
-        start_formatted = start_time
-    
-    if end_time != 'Ongoing' and end_time != 'Unknown':
-        try:
-            end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-            end_formatted = end_dt.strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            end_formatted = end_time
-    else:
-        end_formatted = end_time
+    start_formatted = format_timestamp(start_time) if start_time else UNKNOWN
+    end_formatted = format_timestamp(end_time) if end_time else ONGOING
+    duration = time_interval.get('duration') or UNKNOWN
+    description = entry.get('description') or NO_DESCRIPTION
+    project = (entry.get('project') or {}).get('name') or NO_PROJECT
     
     return f"{start_formatted} - {end_formatted} ({duration}) | {project} | {description}"
 
+def delete_entry(entry_id):
+    """Delete a single Clockify entry.
+
+    Returns a tuple of (success, message to report).
+    """
+    try:
+        get_clockify_client().delete_entry(entry_id)
+        return True, f"  Success: Entry {entry_id} deleted"
+    except ClockifyError as e:
+        return False, f"  Error deleting entry {entry_id}: {e}"
+
+def delete_entry_batch(entry_ids):
+    """Delete a batch of Clockify entries with one request.
+
+    Falls back to deleting the entries one by one if the batch fails, so a
+    single bad entry can't keep the rest from being deleted. Returns a list
+    of (entry ID, success, message to report) tuples.
+    """
+    try:
+        get_clockify_client().delete_entries(entry_ids)
+    except ClockifyError:
+        return [(entry_id, *delete_entry(entry_id)) for entry_id in entry_ids]
+    return [(entry_id, True, f"  Success: Entry {entry_id} deleted") for entry_id in entry_ids]
+
 def delete_clockify_entries(entries, dry_run=False, interactive=False):
-    """Delete Clockify entries."""
-    if not entries:
-        print("No entries found to delete.")
-        return
-    
+    """Delete Clockify entries, returning the IDs of the deleted ones."""
+    found_count = 0
     success_count = 0
     skipped_count = 0
-    
-    print(f"Found {len(entries)} entries in the specified date range:")
+    to_delete = []
+    deleted_ids = []
     
     for entry in entries:
+        found_count += 1
         entry_id = entry.get('id')
         if not entry_id:
             print("Skipping entry without ID")
@@ -129,35 +145,46 @@ def delete_clockify_entries(entries, dry_run=False, interactive=False):
                 skipped_count += 1
                 continue
         
-        # Delete the entry
-        try:
-            print(f"Deleting: {entry_info}")
-            result = subprocess.run(
-                ["clockify-cli", "delete", entry_id, "-i=0"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            print(f"  Success: Entry deleted")
-            success_count += 1
-        except subprocess.CalledProcessError as e:
-            print(f"  Error deleting entry {entry_id}: {e.stderr.strip()}")
-            skipped_count += 1
+        print(f"Deleting: {entry_info}")
+        to_delete.append(entry_id)
+    
+    # Deleting while Clockify is still paging through the entries would shift the
+    # pages, so only start once all of them are listed. Batches are deleted in
+    # parallel, the rate limiter keeps us under Clockify's limit.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(delete_entry_batch, to_delete[i:i + DELETE_BATCH_SIZE])
+            for i in range(0, len(to_delete), DELETE_BATCH_SIZE)
+        ]
+        for future in as_completed(futures):
+            for entry_id, success, message in future.result():
+                print(message)
+                if success:
+                    success_count += 1
+                    deleted_ids.append(entry_id)
+                else:
+                    skipped_count += 1
     
-    print(f"\nDeletion summary:")
+    if not found_count:
+        print("No entries found to delete.")
+        return deleted_ids
+    
+    print(f"\nFound {found_count} entries in the specified date range.")
+    print(f"Deletion summary:")
     print(f"  Successfully {'processed' if dry_run else 'deleted'}: {success_count}")
     print(f"  Skipped: {skipped_count}")
+    return deleted_ids
 
 def main():
     """Main function."""
     args = parse_arguments()
     
-    # Check if clockify-cli is available
+    # Check that we can talk to Clockify
     try:
-        subprocess.run(["clockify-cli", "version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: clockify-cli not found or not working properly.")
-        print("Please install it from: https://github.com/lucassabreu/clockify-cli")
+        get_clockify_client().get_user()
+    except ClockifyError as e:
+        print(f"Error: Could not connect to Clockify: {e}")
+        print("Set CLOCKIFY_TOKEN (and optionally CLOCKIFY_WORKSPACE) or configure clockify-cli.")
         sys.exit(1)
     
     # Validate date formats
@@ -176,7 +203,10 @@ def main():
         print("\n=== DRY RUN MODE ===")
     
     # Delete entries
-    delete_clockify_entries(entries, args.dry_run, args.interactive)
+    deleted_ids = delete_clockify_entries(entries, args.dry_run, args.interactive)
+    
+    # Deleted entries have to be migrated again if timew2clockify is re-run
+    forget_clockify_entries(args.cache_file, deleted_ids)
     
     if not args.dry_run and not args.interactive:
         print("\nWarning: All entries in the date range have been permanently deleted!")
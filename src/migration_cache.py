@@ -0,0 +1,53 @@
+"""
+Cache of Timewarrior entries that were already migrated to Clockify.
+
+Maps every migrated Timewarrior entry (its start, end and tags, and the Clockify
+workspace it was migrated to) to the ID of the Clockify entry created for it, so
+re-running a migration over a date range that was already (partly) migrated only
+adds the new entries. The cache is a JSON file, read once at startup and written
+once at the end of a run.
+"""
+
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE_FILE = os.path.expanduser("~/.cache/timew2clockify/migrated.json")
+
+def entry_key(entry, workspace):
+    """Key identifying a Timewarrior entry migrated to a Clockify workspace in the cache."""
+    tags_hash = hashlib.sha1("\0".join(entry.get('tags', [])).encode()).hexdigest()[:16]
+    return f"{workspace} {entry['start']} {entry['end']} {tags_hash}"
+
+def load_migration_cache(cache_file):
+    """Load the cache, returning an empty one if there is none yet."""
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Warning: Ignoring invalid migration cache {cache_file}: {e}")
+        return {}
+
+def save_migration_cache(cache_file, cache):
+    """Write the cache, replacing the old file only once the new one is complete."""
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, cache_file)
+
+def forget_clockify_entries(cache_file, clockify_ids):
+    """Drop the entries migrated to the given Clockify entries, e.g. after deleting them."""
+    if not os.path.exists(cache_file):
+        return
+
+    clockify_ids = set(clockify_ids)
+    cache = load_migration_cache(cache_file)
+    kept = {key: clockify_id for key, clockify_id in cache.items() if clockify_id not in clockify_ids}
+    if len(kept) != len(cache):
+        save_migration_cache(cache_file, kept)
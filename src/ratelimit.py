@@ -0,0 +1,82 @@
+"""
+Rate limiting helpers for the Clockify API.
+
+Clockify allows at most 10 API requests per second. Every request made by the
+scripts goes through a token bucket shared between worker threads, and is
+retried with exponential backoff when Clockify still answers with HTTP 429.
+A 429 also halves the bucket's rate, so the scripts settle on a rate the API
+accepts instead of hitting the limit over and over. Once requests go through
+again the rate is slowly raised back to Clockify's limit.
+"""
+
+import threading
+import time
+
+# Clockify's documented rate limit (requests per second)
+CLOCKIFY_RATE_LIMIT = 10
+
+# Lowest rate (requests per second) the bucket slows down to after 429s
+MIN_RATE = 1
+
+# Number of times a rate limited call is retried before giving up
+MAX_RETRIES = 5
+
+# Seconds after slowing down during which further 429s don't slow down again,
+# requests sent before the rate was lowered are still being rejected
+THROTTLE_COOLDOWN = 1
+
+# Number of successful requests after which the rate is raised by one request per second
+RECOVER_AFTER = 20
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+
+    def __init__(self, rate=CLOCKIFY_RATE_LIMIT, burst=CLOCKIFY_RATE_LIMIT):
+        self.rate = rate
+        self.max_rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.throttled = None
+        self.successes = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Take tokens from the bucket, blocking until they are available.
+
+        Asking for more tokens than the burst size is allowed: the bucket goes
+        into debt and the caller (and everyone after it) waits for the refill.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttle(self):
+        """Halve the rate and drop the saved-up burst after a request was rejected with HTTP 429."""
+        with self.lock:
+            now = time.monotonic()
+            if self.throttled is not None and now - self.throttled < THROTTLE_COOLDOWN:
+                return
+            self.throttled = now
+            self.successes = 0
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def recover(self):
+        """Raise a throttled rate back towards the original one after a request went through."""
+        with self.lock:
+            if self.rate >= self.max_rate:
+                return
+            self.successes += 1
+            if self.successes >= RECOVER_AFTER:
+                self.successes = 0
+                self.rate = min(self.max_rate, self.rate + 1)
+
+# Shared by all Clockify requests since the limit applies per API key
+clockify_bucket = TokenBucket()
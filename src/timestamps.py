@@ -0,0 +1,30 @@
+"""
+Timestamp parsing shared by the scripts.
+
+Timewarrior exports timestamps in ISO 8601's basic format (20250501T080000Z),
+Clockify answers with the extended one (2025-05-01T08:00:00Z). Python 3.11+
+parses both natively, older versions only know the extended format and no "Z"
+suffix, so it is rewritten for them first.
+"""
+
+import re
+import sys
+from datetime import datetime
+
+BASIC_TIMESTAMP_PATTERN = re.compile(r'(\d{4})(\d{2})(\d{2})T(\d{2})(\d{2})(\d{2})(.*)')
+
+def to_extended_format(timestamp):
+    """Rewrite a basic format timestamp (20250501T080000Z) as 2025-05-01T08:00:00Z, others are returned as-is."""
+    match = BASIC_TIMESTAMP_PATTERN.fullmatch(timestamp)
+    if not match:
+        return timestamp
+    return "{}-{}-{}T{}:{}:{}{}".format(*match.groups())
+
+def _parse_timestamp_compat(timestamp):
+    """Parse an ISO 8601 timestamp in either format, accepting a "Z" suffix for UTC."""
+    return datetime.fromisoformat(to_extended_format(timestamp).replace('Z', '+00:00'))
+
+if sys.version_info >= (3, 11):
+    parse_timestamp = datetime.fromisoformat
+else:
+    parse_timestamp = _parse_timestamp_compat
@@ -2,21 +2,61 @@
 """
 Timewarrior to Clockify Migration Tool
 
-This script helps migrate time entries from Timewarrior to Clockify using the clockify-cli tool.
-It uses the second tag in each Timewarrior entry to map to a Clockify client/project.
-The first tag is used as the description for the Clockify task.
+This script helps migrate time entries from Timewarrior to Clockify using the Clockify API.
+By default it uses the second tag in each Timewarrior entry to map to a Clockify client/project,
+and the first tag as the description for the Clockify task (see --project-tag-index,
+--description-tag-index and --description-from).
 """
 
 import argparse
-import json
+import functools
+import itertools
 import subprocess
 import sys
 import os
-from datetime import datetime, timedelta
+import re
+import shutil
+import signal
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta, timezone
+
+import ijson
+
+from clockify_api import ClockifyError, get_clockify_client
+from migration_cache import DEFAULT_CACHE_FILE, entry_key, load_migration_cache, save_migration_cache
+from timestamps import parse_timestamp
 
 # Config file for mapping timewarrior tags to clockify projects
 DEFAULT_CONFIG_FILE = os.path.expanduser("~/.config/timew2clockify/mapping.conf")
 
+# One "tag=client/project" mapping per line, blank and comment lines are skipped.
+# Non-comment lines without a "=" are matched as "invalid" so they can be reported.
+MAPPING_LINE_PATTERN = re.compile(
+    r'^[^\S\n]*(?:'
+    r'(?P<tag>[^#=\s][^=\n]*?)[^\S\n]*=[^\S\n]*'
+    r'(?P<client>[^/\n]*?)[^\S\n]*(?:/[^\S\n]*(?P<project>[^\n]*?))?'
+    r'|(?P<invalid>[^#\s][^\n]*?)'
+    r')[^\S\n]*$',
+    re.MULTILINE
+)
+
+# Bytes read from the timew export pipe at a time
+EXPORT_READ_SIZE = 64 * 1024
+
+# Number of Clockify API requests running in parallel
+MAX_WORKERS = 8
+
+# Number of entries waiting to be added before we stop reading new ones
+MAX_PENDING = MAX_WORKERS * 4
+
+def non_negative_int(value):
+    """Argument type for tag positions."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or greater: {value}")
+    return number
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Migrate Timewarrior entries to Clockify')
@@ -43,42 +83,74 @@ def parse_arguments():
         action='store_true',
         help='Skip interactive prompt for unmapped tags'
     )
+    parser.add_argument(
+        '--project-tag-index',
+        type=non_negative_int,
+        default=1,
+        help='Position of the tag mapped to a Clockify client/project, starting at 0 (default: 1)'
+    )
+    parser.add_argument(
+        '--description-tag-index',
+        type=non_negative_int,
+        default=0,
+        help='Position of the tag used as description with --description-from=single-tag (default: 0)'
+    )
+    parser.add_argument(
+        '--description-from',
+        choices=['single-tag', 'remaining-tags'],
+        default='single-tag',
+        help='Use a single tag as description, or all tags except the project tag (default: single-tag)'
+    )
+    parser.add_argument(
+        '--cache-file',
+        default=DEFAULT_CACHE_FILE,
+        help=f'Path to the cache of already migrated entries (default: {DEFAULT_CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Migrate all entries, even ones an earlier run already migrated (they are still recorded)'
+    )
     return parser.parse_args()
 
 def load_mapping_config(config_file):
     """Load the mapping configuration from the config file."""
     mapping = {}
     
-    # Create config directory if it doesn't exist
-    os.makedirs(os.path.dirname(config_file), exist_ok=True)
-    
-    # Create config file with example if it doesn't exist
-    if not os.path.exists(config_file):
-        with open(config_file, 'w') as f:
-            f.write("# Timewarrior tag to Clockify client/project mapping\n")
-            f.write("# Format: tag=client/project\n")
-            f.write("# Example:\n")
-            f.write("# development=MyClient/WebApp\n")
-            f.write("# meetings=Internal/Meetings\n")
-        print(f"Created example config file at {config_file}")
-        print("Please edit this file to define your tag mappings and run the script again.")
-        sys.exit(1)
+    # Load the mapping, the config file normally exists so try that first
+    try:
+        with open(config_file, 'r') as f:
+            data = f.read()
+    except FileNotFoundError:
+        # Create config directory if it doesn't exist
+        config_dir = os.path.dirname(config_file)
+        if config_dir and not os.path.isdir(config_dir):
+            os.makedirs(config_dir, exist_ok=True)
+        
+        # Create config file with example, without overwriting it in case it
+        # was created in the meantime
+        try:
+            fd = os.open(config_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            with open(config_file, 'r') as f:
+                data = f.read()
+        else:
+            with os.fdopen(fd, 'w') as f:
+                f.write("# Timewarrior tag to Clockify client/project mapping\n")
+                f.write("# Format: tag=client/project\n")
+                f.write("# Example:\n")
+                f.write("# development=MyClient/WebApp\n")
+                f.write("# meetings=Internal/Meetings\n")
+            print(f"Created example config file at {config_file}")
+            print("Please edit this file to define your tag mappings and run the script again.")
+            sys.exit(1)
     
-    # Load the mapping
-    with open(config_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-                
-            parts = line.split('=', 1)
-            if len(parts) != 2:
-                print(f"Warning: Ignoring invalid mapping line: {line}")
-                continue
-                
-            tag, project = parts
-            client, proj = project.split('/', 1) if '/' in project else (project, "")
-            mapping[tag.strip()] = (client.strip(), proj.strip())
+    for match in MAPPING_LINE_PATTERN.finditer(data):
+        if match.group('invalid'):
+            print(f"Warning: Ignoring invalid mapping line: {match.group('invalid')}")
+            continue
+        
+        mapping[sys.intern(match.group('tag'))] = (match.group('client'), match.group('project') or "")
     
     return mapping
 
@@ -89,82 +161,47 @@ def save_mapping_to_config(config_file, tag, client, project):
     print(f"Added mapping for tag '{tag}' to config file: {client}/{project}")
 
 def get_clockify_clients():
-    """Get list of active clients from Clockify using JSON output."""
+    """Get list of active clients from Clockify."""
     try:
-        result = subprocess.run(
-            ["clockify-cli", "client", "list", "--not-archived", "--json"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-        
-        # Parse the JSON output
-        clients = []
-        client_data = json.loads(result.stdout)
-        
-        for client in client_data:
-            clients.append({
-                "id": client["id"],
-                "name": client["name"]
-            })
-        
-        return clients
-    except subprocess.CalledProcessError as e:
-        print(f"Error getting Clockify clients: {e.stderr}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error parsing Clockify clients JSON: {e}")
+        return [
+            {"id": client["id"], "name": client["name"]}
+            for client in get_clockify_client().list_clients()
+        ]
+    except ClockifyError as e:
+        print(f"Error getting Clockify clients: {e}")
         return []
 
 def get_clockify_projects(client_id):
-    """Get list of projects for a client from Clockify using JSON output."""
+    """Get list of projects for a client from Clockify."""
     try:
-        result = subprocess.run(
-            ["clockify-cli", "project", "list", "--clients", client_id, "--json"], 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-        
-        # Parse the JSON output
-        projects = []
-        project_data = json.loads(result.stdout)
-        
-        for project in project_data:
-            projects.append({
-                "id": project["id"],
-                "name": project["name"]
-            })
-        
-        return projects
-    except subprocess.CalledProcessError as e:
-        print(f"Error getting Clockify projects: {e.stderr}")
-        return []
-    except json.JSONDecodeError as e:
-        print(f"Error parsing Clockify projects JSON: {e}")
+        return [
+            {"id": project["id"], "name": project["name"]}
+            for project in get_clockify_client().list_projects(client_id)
+        ]
+    except ClockifyError as e:
+        print(f"Error getting Clockify projects: {e}")
         return []
 
-def find_project_id(client_name, project_name):
-    """Find project ID given client and project names."""
-    # First get the client ID
-    clients = get_clockify_clients()
-    client_id = None
-    
-    for client in clients:
-        if client["name"] == client_name:
-            client_id = client["id"]
-            break
-    
-    if not client_id:
-        return None
-    
-    # Then get the project ID
-    projects = get_clockify_projects(client_id)
-    for project in projects:
-        if project["name"] == project_name:
-            return project["id"]
-    
-    return None
+@functools.lru_cache(maxsize=None)
+def _clients_cached():
+    """Get the Clockify clients, fetching them only once per run."""
+    return get_clockify_clients()
+
+@functools.lru_cache(maxsize=None)
+def _projects_cached(client_id):
+    """Get the projects of a Clockify client, fetching them only once per run."""
+    return get_clockify_projects(client_id)
+
+def get_project_ids():
+    """Map (client name, project name) pairs to project IDs for all active projects."""
+    try:
+        return {
+            (project.get("clientName") or "", project["name"]): project["id"]
+            for project in get_clockify_client().list_projects()
+        }
+    except ClockifyError as e:
+        print(f"Error getting Clockify projects: {e}")
+        return {}
 
 def prompt_for_client_project(tag, config_file):
     """Prompt user to select a client and project for an unmapped tag."""
@@ -173,7 +210,7 @@ def prompt_for_client_project(tag, config_file):
     
     # Get list of clients
     print("\nFetching available clients...")
-    clients = get_clockify_clients()
+    clients = _clients_cached()
     
     if not clients:
         print("No active clients found in Clockify.")
@@ -197,7 +234,7 @@ def prompt_for_client_project(tag, config_file):
     
     # Get list of projects for the selected client
     print(f"\nFetching projects for client '{selected_client['name']}'...")
-    projects = get_clockify_projects(selected_client['id'])
+    projects = _projects_cached(selected_client['id'])
     
     if not projects:
         print(f"No active projects found for client '{selected_client['name']}'.")
@@ -226,177 +263,273 @@ def prompt_for_client_project(tag, config_file):
     
     return selected_client['name'], selected_project['name']
 
+def local_date_to_timew(date_str):
+    """Convert a local YYYY-MM-DD date to the timew export timestamp (UTC) of its midnight."""
+    return datetime.strptime(date_str, '%Y-%m-%d').astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
 def get_timewarrior_entries(start_date=None, end_date=None):
-    """Get time entries from Timewarrior."""
+    """Stream time entries from Timewarrior, yielding them one at a time."""
     cmd = ["timew", "export"]
     
+    # timew also exports entries that only overlap the range (e.g. started the
+    # evening before), so keep track of the range to drop those ourselves
+    start_cutoff = end_cutoff = None
+    
     if start_date:
         cmd.extend(["from", start_date])
+        try:
+            start_cutoff = local_date_to_timew(start_date)
+        except ValueError:
+            # Leave dates timew understands but we don't (e.g. "yesterday") to timew
+            pass
     if end_date:
         # Add one day to end_date to make the range inclusive
         # since timewarrior's date range is exclusive of the end date
         try:
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
             inclusive_end = (end_dt + timedelta(days=1)).strftime('%Y-%m-%d')
-            cmd.extend(["-", inclusive_end])
+            cmd.extend(["to", inclusive_end])
+            end_cutoff = local_date_to_timew(inclusive_end)
         except ValueError:
             # If date parsing fails, use the original end_date
-            cmd.extend(["-", end_date])
+            cmd.extend(["to", end_date])
     
+    # Parse the export as it is being written instead of buffering all of it.
+    # ijson reads the raw bytes in large chunks itself, so the pipe is
+    # unbuffered (bufsize=0) instead of copying everything through a
+    # second buffer, and nothing is decoded to text.
+    # timew's errors go to a temporary file instead of a second pipe, which
+    # could fill up and block timew while we are only reading stdout.
+    with tempfile.TemporaryFile() as stderr, \
+            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, bufsize=0) as proc:
+        try:
+            for entry in ijson.items(proc.stdout, 'item', buf_size=EXPORT_READ_SIZE, use_float=True):
+                # timew timestamps are fixed-width UTC strings, so they compare
+                # correctly as plain strings without parsing them
+                if start_cutoff and entry['start'] < start_cutoff:
+                    continue
+                if end_cutoff and entry['start'] >= end_cutoff:
+                    continue
+                yield entry
+            parse_error = None
+        except ijson.JSONError as e:
+            parse_error = e
+            # Nobody reads the rest of the output, stop timew instead of waiting
+            # for it while it blocks on a full pipe
+            proc.kill()
+        
+        # Killed by us means timew was still running fine, report why we stopped it
+        if proc.wait() != 0 and proc.returncode != -signal.SIGKILL:
+            stderr.seek(0)
+            print(f"Error running Timewarrior export: exit status {proc.returncode}")
+            print(f"Output: {stderr.read().decode(errors='replace')}")
+            sys.exit(1)
+        if parse_error:
+            print(f"Error parsing Timewarrior output: {parse_error}")
+            sys.exit(1)
+
+def to_clockify_timestamp(timestamp):
+    """Convert a Timewarrior timestamp (20250501T080000Z) to the Clockify format (2025-05-01T08:00:00Z)."""
+    if len(timestamp) == 16 and timestamp[8] == 'T' and timestamp[15] == 'Z':
+        # Rearranging timew's basic ISO 8601 format is enough, no need to parse it
+        return (f"{timestamp[0:4]}-{timestamp[4:6]}-{timestamp[6:8]}"
+                f"T{timestamp[9:11]}:{timestamp[11:13]}:{timestamp[13:15]}Z")
+    return parse_timestamp(timestamp).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def add_clockify_entry(header, project_id, description, start_str, end_str):
+    """Add a single entry to Clockify.
+
+    Returns a tuple of (ID of the new Clockify entry or None on failure, list of messages to report).
+    """
+    messages = [header]
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        entries = json.loads(result.stdout)
-        return entries
-    except subprocess.CalledProcessError as e:
-        print(f"Error running Timewarrior export: {e}")
-        print(f"Output: {e.stderr}")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing Timewarrior output: {e}")
-        sys.exit(1)
+        entry = get_clockify_client().add_entry(start_str, end_str, project_id, description)
+        messages.append(f"  Success: Added entry {entry['id']}")
+        return entry['id'], messages
+    except ClockifyError as e:
+        messages.append(f"  Error: {e}")
+        return None, messages
+
+def split_tags(tags, project_tag_index=1, description_tag_index=0, description_from='single-tag'):
+    """Get the (project tag, description) of an entry's tags, or None if there are too few tags."""
+    if description_from == 'remaining-tags':
+        if len(tags) <= project_tag_index:
+            return None
+        description = ' '.join(tag for i, tag in enumerate(tags) if i != project_tag_index)
+    else:
+        if len(tags) <= max(project_tag_index, description_tag_index):
+            return None
+        description = tags[description_tag_index]
+    
+    return tags[project_tag_index], description
 
-def migrate_to_clockify(entries, mapping, config_file, dry_run=False, interactive=True):
-    """Migrate Timewarrior entries to Clockify."""
-    if not entries:
+def migrate_to_clockify(entries, mapping, config_file, dry_run=False, interactive=True,
+                        project_tag_index=1, description_tag_index=0, description_from='single-tag',
+                        migrated=None, skip_migrated=True):
+    """Migrate Timewarrior entries to Clockify.
+
+    `migrated` is the cache of already migrated entries (see migration_cache),
+    newly migrated ones are added to it and, unless `skip_migrated` is false,
+    matching entries are skipped.
+    """
+    entries = iter(entries)
+    first_entry = next(entries, None)
+    if first_entry is None:
         print("No Timewarrior entries found to migrate.")
         return
+    entries = itertools.chain([first_entry], entries)
     
     success_count = 0
     skipped_count = 0
+    already_migrated_count = 0
     
     # Cache for interactive selections
     interactive_cache = {}
     
-    for entry in entries:
-        # Skip entries without tags or with fewer than 2 tags
-        if not entry.get('tags') or len(entry.get('tags', [])) < 2:
-            print(f"Skipping entry with insufficient tags: {entry.get('start')} - {entry.get('end', 'ongoing')}")
-            skipped_count += 1
-            continue
-        
-        # Get the first tag for description
-        description = entry['tags'][0]
-        
-        # Get the second tag for client/project mapping
-        second_tag = entry['tags'][1]
+    # Entries migrated to another workspace still need to be added to this one
+    workspace = get_clockify_client().workspace
+    
+    # Ask about all unmapped tags up front so the migration never stalls on a prompt
+    # (this needs all entries, otherwise they are migrated while the export is still being read)
+    if interactive:
+        entries = list(entries)
+        unmapped_entries = {}
+        for entry in entries:
+            # Don't ask about entries that are skipped anyway
+            if 'end' not in entry:
+                continue
+            if skip_migrated and migrated is not None and entry_key(entry, workspace) in migrated:
+                continue
+            tags = split_tags(entry.get('tags') or [], project_tag_index, description_tag_index, description_from)
+            if tags and tags[0] not in mapping:
+                unmapped_entries.setdefault(tags[0], entry)
         
-        # Look up the client/project in the mapping
-        if second_tag in mapping:
-            client, project = mapping[second_tag]
-        elif second_tag in interactive_cache:
-            client, project = interactive_cache[second_tag]
-        elif interactive:
+        for tag, entry in unmapped_entries.items():
             print(f"\nProcessing entry: {entry.get('start')} - {entry.get('end', 'ongoing')}")
             print(f"Tags: {', '.join(entry['tags'])}")
             
-            client, project = prompt_for_client_project(second_tag, config_file)
+            client, project = prompt_for_client_project(tag, config_file)
             if client and project:
-                interactive_cache[second_tag] = (client, project)
+                interactive_cache[sys.intern(tag)] = (client, project)
+    
+    # Resolve client/project names to IDs once, instead of once per entry
+    project_ids = {} if dry_run else get_project_ids()
+    
+    # Entries are added in parallel while the export is still being read, the
+    # rate limiter keeps us under Clockify's limit
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    futures = {}
+    
+    def report(done):
+        """Print the results of finished entries and record the migrated ones."""
+        nonlocal success_count, skipped_count
+        for future in done:
+            try:
+                clockify_id, messages = future.result()
+            except Exception as e:
+                # An unexpected error in one entry must not stop recording the others
+                clockify_id, messages = None, [f"Error adding entry: {e!r}"]
+            for message in messages:
+                print(message)
+            if clockify_id:
+                success_count += 1
+                if migrated is not None:
+                    migrated[futures[future]] = clockify_id
             else:
-                print(f"Skipping entry with unmapped tag '{second_tag}'")
+                skipped_count += 1
+            del futures[future]
+    
+    try:
+        for entry in entries:
+            # Get the tag for client/project mapping and the description,
+            # skipping entries without enough tags
+            tags = split_tags(entry.get('tags') or [], project_tag_index, description_tag_index, description_from)
+            if not tags:
+                print(f"Skipping entry with insufficient tags: {entry.get('start')} - {entry.get('end', 'ongoing')}")
                 skipped_count += 1
                 continue
-        else:
-            print(f"Skipping entry with unmapped tag '{second_tag}': {entry.get('start')} - {entry.get('end', 'ongoing')}")
-            skipped_count += 1
-            continue
+            project_tag, description = tags
         
-        # Parse start and end times
-        start_time = datetime.fromisoformat(entry['start'].replace('Z', '+00:00'))
-        
-        if 'end' in entry:
-            end_time = datetime.fromisoformat(entry['end'].replace('Z', '+00:00'))
-        else:
-            # If no end time, skip the entry
-            print(f"Skipping ongoing entry: {entry.get('start')} - {', '.join(entry['tags'])}")
-            skipped_count += 1
-            continue
+            if 'end' not in entry:
+                # If no end time, skip the entry
+                print(f"Skipping ongoing entry: {entry.get('start')} - {', '.join(entry['tags'])}")
+                skipped_count += 1
+                continue
         
-        # Format times for clockify-cli
-        start_str = start_time.strftime("%Y-%m-%d %H:%M:%S")
-        end_str = end_time.strftime("%Y-%m-%d %H:%M:%S")
+            # Skip entries migrated by an earlier run
+            key = entry_key(entry, workspace)
+            if skip_migrated and migrated is not None and key in migrated:
+                already_migrated_count += 1
+                continue
         
-        # Build the clockify-cli command
-        cmd = [
-            "clockify-cli", "manual",
-            "--client", client,
-            "--project", project,
-            "--description", description,
-            "--when", start_str,
-            "--when-to-close", end_str,
-            "--allow-name-for-id",
-            "-i=0" # clockify  cli is usually interactive
-        ]
+            # Look up the client/project in the mapping (keys are interned, so
+            # interning the tag lets the lookup match on identity)
+            project_tag = sys.intern(project_tag)
+            hit = mapping.get(project_tag)
+            if hit is None:
+                hit = interactive_cache.get(project_tag)
+            if hit is not None:
+                client, project = hit
+            else:
+                print(f"Skipping entry with unmapped tag '{project_tag}': {entry.get('start')} - {entry.get('end', 'ongoing')}")
+                skipped_count += 1
+                continue
         
-        if dry_run:
-            duration = end_time - start_time
-            hours = duration.total_seconds() / 3600
-            print(f"Would add: {start_time} - {end_time} ({hours:.2f}h) to {client}/{project}: {description}")
-            success_count += 1
-        else:
-            try:
-                print(f"Adding: {start_time} - {end_time} to {client}/{project}: {description}")
-                print(f"Running\n\t {' '.join(cmd)}")
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                print(f"  Success: {result.stdout.strip()}")
+            if dry_run:
+                # The times only need to be parsed to show the duration
+                start_time = parse_timestamp(entry['start'])
+                end_time = parse_timestamp(entry['end'])
+                duration = end_time - start_time
+                hours = duration.total_seconds() / 3600
+                print(f"Would add: {start_time} - {end_time} ({hours:.2f}h) to {client}/{project}: {description}")
                 success_count += 1
-            except subprocess.CalledProcessError as e:
-                error_msg = e.stderr.strip()
-                print(f"  Error: {error_msg}")
-                
-                # Try fallback method if the error is about project not found
-                if "No project with id or name containing" in error_msg:
-                    print(f"  Attempting fallback: looking up project ID...")
-                    project_id = find_project_id(client, project)
-                    
-                    if project_id:
-                        # Try using project ID directly
-                        fallback_cmd = [
-                            "clockify-cli", "manual",
-                            project_id,
-                            start_str,
-                            end_str,
-                            description,
-                            "--allow-name-for-id",
-                            "-i=0"
-                        ]
-                        
-                        try:
-                            print(f"  Fallback: Using project ID {project_id}")
-                            print(f"  Running\n\t {' '.join(fallback_cmd)}")
-                            result = subprocess.run(fallback_cmd, capture_output=True, text=True, check=True)
-                            print(f"  Fallback Success: {result.stdout.strip()}")
-                            success_count += 1
-                        except subprocess.CalledProcessError as fallback_e:
-                            print(f"  Fallback Error: {fallback_e.stderr.strip()}")
-                            skipped_count += 1
-                    else:
-                        print(f"  Fallback failed: Could not find project ID for {client}/{project}")
-                        skipped_count += 1
-                else:
+            else:
+                project_id = project_ids.get((client, project))
+                if not project_id:
+                    print(f"Skipping entry, could not find project ID for {client}/{project}: {entry.get('start')} - {entry.get('end')}")
                     skipped_count += 1
+                    continue
+            
+                start_str = to_clockify_timestamp(entry['start'])
+                end_str = to_clockify_timestamp(entry['end'])
+                header = f"Adding: {start_str} - {end_str} to {client}/{project}: {description}"
+                futures[executor.submit(add_clockify_entry, header, project_id, description, start_str, end_str)] = key
+            
+                # Don't read further ahead than the workers can keep up with
+                if len(futures) >= MAX_PENDING:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    report(done)
+    
+        # Report the remaining entries as they finish
+        report(as_completed(list(futures)))
+    finally:
+        # Nothing is left when all entries were read, but if aborted (e.g. timew
+        # failed or Ctrl+C) drop the queued entries, and wait for the running ones
+        # and record them before the cache is saved
+        executor.shutdown(wait=True, cancel_futures=True)
+        report([future for future in list(futures) if not future.cancelled()])
     
     print(f"\nMigration summary:")
     print(f"  Successfully {'processed' if dry_run else 'migrated'}: {success_count}")
     print(f"  Skipped: {skipped_count}")
+    if already_migrated_count:
+        print(f"  Already migrated: {already_migrated_count}")
 
 def main():
     """Main function."""
     args = parse_arguments()
     
-    # Check if clockify-cli is available
+    # Check that we can talk to Clockify
     try:
-        subprocess.run(["clockify-cli", "version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: clockify-cli not found or not working properly.")
-        print("Please install it from: https://github.com/lucassabreu/clockify-cli")
+        get_clockify_client().get_user()
+    except ClockifyError as e:
+        print(f"Error: Could not connect to Clockify: {e}")
+        print("Set CLOCKIFY_TOKEN (and optionally CLOCKIFY_WORKSPACE) or configure clockify-cli.")
         sys.exit(1)
     
-    # Check if timewarrior is available
-    try:
-        subprocess.run(["timew", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: Timewarrior (timew) not found or not working properly.")
+    # Check if timewarrior is available (looking it up on PATH, without running it)
+    if not os.environ.get("TIMEW2CLOCKIFY_SKIP_CHECK") and shutil.which("timew") is None:
+        print("Error: Timewarrior (timew) not found on PATH.")
         print("Please install it from: https://github.com/GothenburgBitFactory/timewarrior")
         sys.exit(1)
 
@@ -409,8 +542,20 @@ def main():
     # Get timewarrior entries
     entries = get_timewarrior_entries(args.start, args.end)
     
-    # Migrate entries to clockify
-    migrate_to_clockify(entries, mapping, args.config, args.dry_run, not args.no_interactive)
+    # Load the entries migrated by earlier runs, with --no-cache they are
+    # migrated again but still recorded so later runs don't duplicate them
+    migrated = load_migration_cache(args.cache_file)
+    
+    # Migrate entries to clockify, recording what was migrated even if interrupted
+    try:
+        migrate_to_clockify(
+            entries, mapping, args.config, args.dry_run, not args.no_interactive,
+            args.project_tag_index, args.description_tag_index, args.description_from,
+            migrated, not args.no_cache
+        )
+    finally:
+        if not args.dry_run:
+            save_migration_cache(args.cache_file, migrated)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file